@@ -2,7 +2,7 @@
 Use Cases (Сценарии использования) и интерфейсы
 """
 
-from typing import Protocol, Tuple
+from typing import Optional, Protocol, Tuple
 from dataclasses import dataclass
 from domain.entities import Order, Money
 
@@ -30,6 +30,17 @@ class PaymentGateway(Protocol):
         ...
 
 
+class Profiler(Protocol):
+    """Интерфейс профилировщика (контекстный менеджер)"""
+    def __enter__(self) -> "Profiler":
+        """Начать сбор профиля"""
+        ...
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        """Остановить сбор профиля"""
+        ...
+
+
 @dataclass
 class PayOrderResult:
     """Результат операции оплаты"""
@@ -43,9 +54,11 @@ class PayOrderUseCase:
     """Use Case для оплаты заказа"""
     
     def __init__(self, order_repository: OrderRepository, 
-                 payment_gateway: PaymentGateway):
+                 payment_gateway: PaymentGateway,
+                 profiler: Optional[Profiler] = None):
         self.order_repository = order_repository
         self.payment_gateway = payment_gateway
+        self.profiler = profiler
     
     def execute(self, order_id: str) -> PayOrderResult:
         """
@@ -57,6 +70,14 @@ class PayOrderUseCase:
         Returns:
             PayOrderResult: результат операции
         """
+        if self.profiler is None:
+            return self._execute(order_id)
+        
+        with self.profiler:
+            return self._execute(order_id)
+    
+    def _execute(self, order_id: str) -> PayOrderResult:
+        """Сценарий оплаты без профилирования"""
         try:
             # 1. Загружаем заказ
             order = self.order_repository.get_by_id(order_id)
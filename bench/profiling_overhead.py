@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Замер накладных расходов профилировщиков (запускается вручную)
+
+Нагрузка: N оплат заказа из 3 строк через PayOrderUseCase
+с InMemoryOrderRepository и FakePaymentGateway. Для каждого режима
+берется медиана из R запусков, замедление считается относительно
+прогона без профилировщика.
+
+    python bench/profiling_overhead.py [N] [R]
+"""
+
+import cProfile
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from domain.entities import Order
+from domain.value_objects import Money
+from application.use_cases import PayOrderUseCase
+from infrastructure.repositories import InMemoryOrderRepository
+from infrastructure.gateways import FakePaymentGateway
+from infrastructure.profiling import SamplingProfiler, TracingProfiler
+
+
+def prepare(orders: int) -> PayOrderUseCase:
+    """Создать use-case и заполнить репозиторий заказами"""
+    repository = InMemoryOrderRepository()
+    for i in range(orders):
+        order = Order(f"order_{i}", f"customer_{i % 100}")
+        order.add_line("Product A", 2, Money(10.0))
+        order.add_line("Product B", 1, Money(15.5))
+        order.add_line("Product C", 3, Money(2.0))
+        repository.save(order)
+    return PayOrderUseCase(repository, FakePaymentGateway())
+
+
+def pay_all(use_case: PayOrderUseCase, orders: int) -> None:
+    for i in range(orders):
+        use_case.execute(f"order_{i}")
+
+
+def measure(mode: str, orders: int) -> float:
+    """Время одного прогона в секундах"""
+    use_case = prepare(orders)
+    profiler = None
+    if mode == "sampling":
+        profiler = SamplingProfiler()
+    elif mode == "tracing":
+        profiler = TracingProfiler()
+    elif mode == "cProfile":
+        profiler = cProfile.Profile()
+
+    start = time.perf_counter()
+    if profiler is None:
+        pay_all(use_case, orders)
+    else:
+        with profiler:
+            pay_all(use_case, orders)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    orders = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    print(f"Python {sys.version.split()[0]}, {orders} orders, "
+          f"median of {repeats} runs")
+    baseline = None
+    for mode in ("none", "sampling", "tracing", "cProfile"):
+        runs = [measure(mode, orders) for _ in range(repeats)]
+        median = statistics.median(runs)
+        if baseline is None:
+            baseline = median
+        print(f"{mode:>9}: {median * 1000:8.1f} ms  "
+              f"x{median / baseline:.2f}  "
+              f"(min x{min(runs) / baseline:.2f}, max x{max(runs) / baseline:.2f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Симуляция суток нагрузки на InMemoryOrderRepository (запускается вручную)
+
+Каждую симулированную секунду создается RATE оплаченных заказов
+из 3 строк, часы репозитория сдвигаются вместе с нагрузкой. Режимы
+запускаются в отдельных процессах, чтобы RSS одного не влиял на другой.
+RSS читается из /proc/self/status (Linux).
+
+    python bench/retention_24h.py [RATE] [HOURS]
+"""
+
+import os
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from domain.entities import Order
+from domain.value_objects import Money
+from infrastructure.repositories import InMemoryOrderRepository, RetentionPolicy
+
+
+def rss_mb() -> float:
+    """Resident set size текущего процесса в мегабайтах"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def get_latency_us(repository: InMemoryOrderRepository, ids) -> float:
+    """Среднее время get_by_id в микросекундах"""
+    start = time.perf_counter()
+    for order_id in ids:
+        repository.get_by_id(order_id)
+    return (time.perf_counter() - start) / len(ids) * 1_000_000
+
+
+def simulate(mode: str, rate: int, hours: int) -> None:
+    now = datetime(2024, 1, 1)
+    retention = None
+    if mode == "archive":
+        retention = RetentionPolicy(max_age=timedelta(hours=1), check_every=10_000)
+    repository = InMemoryOrderRepository(retention=retention, clock=lambda: now)
+    step = timedelta(seconds=1 / rate)
+    total = hours * 3600 * rate
+    report_every = max(total // 6, 1)
+
+    print(f"mode={mode} start rss={rss_mb():.0f}MB")
+    for i in range(total):
+        order = Order(f"order_{i}", f"customer_{i % 5000}")
+        order.add_line("Product A", 2, Money(10.0))
+        order.add_line("Product B", 1, Money(15.5))
+        order.add_line("Product C", 3, Money(2.0))
+        order.pay()
+        order.paid_at = now
+        repository.save(order)
+        now += step
+        if (i + 1) % report_every == 0:
+            print(f"  {(i + 1) / (3600 * rate):>5.1f}h "
+                  f"live={repository.live_count} "
+                  f"archived={repository.archived_count} "
+                  f"rss={rss_mb():.0f}MB")
+
+    sample = min(10_000, total)
+    oldest = [f"order_{i}" for i in range(sample)]
+    newest = [f"order_{total - 1 - i}" for i in range(sample)]
+    print(f"  get_by_id oldest: {get_latency_us(repository, oldest):.2f}us, "
+          f"newest: {get_latency_us(repository, newest):.2f}us")
+
+
+def main() -> None:
+    if len(sys.argv) > 1 and sys.argv[1] in ("live", "archive"):
+        simulate(sys.argv[1], int(sys.argv[2]), int(sys.argv[3]))
+        return
+
+    rate = sys.argv[1] if len(sys.argv) > 1 else "10"
+    hours = sys.argv[2] if len(sys.argv) > 2 else "24"
+    for mode in ("live", "archive"):
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), mode, rate, hours],
+            check=True
+        )
+
+
+if __name__ == "__main__":
+    main()
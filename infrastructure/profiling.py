@@ -0,0 +1,320 @@
+"""
+Инфраструктурные реализации профилировщиков
+
+Профилировщики собирают стеки вызовов в "свернутом" формате
+(collapsed stacks: "a;b;c <вес>"), который понимают flamegraph.pl,
+speedscope, inferno и аналогичные инструменты, а также формируют
+сводку самых "горячих" функций. Используется только стандартная
+библиотека, сетевые сервисы не нужны. Кадры самого профилировщика
+в результат не попадают.
+
+Накладные расходы (bench/profiling_overhead.py: 20 000 оплат заказа
+из 3 строк через PayOrderUseCase, Python 3.11, медиана из 5 запусков):
+- SamplingProfiler: фоновый поток раз в `interval` секунд снимает стек
+  профилируемого потока. Поток один на весь профилировщик и переживает
+  отдельные входы, поэтому частые короткие входы почти ничего не стоят.
+  Замедление при интервале 5 мс - медиана в 0.9-1.4 раза между
+  запусками, то есть в пределах шума замера. Участки короче `interval` попадают в снимки только
+  статистически, поэтому короткие запуски могут не дать ни одного
+  снимка. Вес стека - число снимков.
+- TracingProfiler: детерминированный, через sys.setprofile учитывает
+  каждый вызов. Точен на коротких запусках, но обработчик событий
+  написан на Python, поэтому замедление - в 7-9 раз (cProfile на той
+  же нагрузке - в 2.5-3.5 раза, но без свернутых стеков).
+  Вес стека - собственное время в наносекундах.
+"""
+
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+_perf_counter_ns = time.perf_counter_ns
+
+
+@dataclass
+class Hotspot:
+    """Строка сводки горячих точек"""
+    frame: str
+    self_weight: int
+    total_weight: int
+
+
+def _frame_name(frame) -> str:
+    """Имя кадра в виде "модуль:Класс.функция" """
+    module = frame.f_globals.get("__name__", "?")
+    code = frame.f_code
+    return f"{module}:{getattr(code, 'co_qualname', code.co_name)}"
+
+
+class _StackProfiler(ABC):
+    """Общая часть профилировщиков: накопление стеков и отчеты"""
+
+    def __init__(self):
+        self._stacks: Counter = Counter()
+        self._lock = threading.Lock()
+        # Сессии независимы для каждого потока
+        self._local = threading.local()
+
+    def __enter__(self) -> "_StackProfiler":
+        # Вложенные входы (CLI + use case) в одном потоке
+        # используют одну сессию
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            self._start(sys._getframe(1))
+        self._local.depth = depth + 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self._local.depth -= 1
+        if self._local.depth == 0:
+            self._stop()
+
+    @abstractmethod
+    def _start(self, root_frame) -> None:
+        """Начать сессию текущего потока от кадра root_frame"""
+
+    @abstractmethod
+    def _stop(self) -> None:
+        """Завершить сессию текущего потока"""
+
+    @property
+    def stacks(self) -> Dict[str, int]:
+        """Копия накопленных стеков: "a;b;c" -> вес"""
+        with self._lock:
+            return dict(self._stacks)
+
+    def reset(self) -> None:
+        """Сбросить накопленные данные"""
+        with self._lock:
+            self._stacks.clear()
+
+    def collapsed(self) -> str:
+        """Стеки в свернутом формате для flame-graph инструментов"""
+        return "".join(
+            f"{stack} {weight}\n"
+            for stack, weight in sorted(self.stacks.items())
+        )
+
+    def write_collapsed(self, path: str) -> None:
+        """Записать свернутые стеки в файл"""
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.collapsed())
+
+    def top(self, n: int = 10) -> List[Hotspot]:
+        """N функций с наибольшим собственным весом"""
+        self_weights: Counter = Counter()
+        total_weights: Counter = Counter()
+        for stack, weight in self.stacks.items():
+            frames = stack.split(";")
+            self_weights[frames[-1]] += weight
+            # Рекурсия не должна учитываться дважды
+            for frame in set(frames):
+                total_weights[frame] += weight
+        return [
+            Hotspot(frame, self_weight, total_weights[frame])
+            for frame, self_weight in self_weights.most_common(n)
+        ]
+
+    def format_top(self, n: int = 10) -> str:
+        """Сводка горячих точек в виде текстовой таблицы"""
+        total = sum(self.stacks.values())
+        if not total:
+            return "No samples collected"
+        lines = [f"{'self':>7} {'self%':>6} {'total':>7} {'total%':>6}  frame"]
+        for hotspot in self.top(n):
+            lines.append(
+                f"{hotspot.self_weight:>7} "
+                f"{hotspot.self_weight / total:>6.1%} "
+                f"{hotspot.total_weight:>7} "
+                f"{hotspot.total_weight / total:>6.1%}  {hotspot.frame}"
+            )
+        return "\n".join(lines)
+
+
+class SamplingProfiler(_StackProfiler):
+    """
+    Семплирующий профилировщик на основе sys._current_frames()
+
+    Поток-семплер запускается при первом входе и не останавливается
+    между входами: частые короткие вызовы (например, execute на каждый
+    заказ пакета) стоят только регистрации цели. За один снимок
+    обходятся все потоки с активной сессией. Без активных сессий
+    поток завершается сам через `idle_timeout` секунд.
+    """
+
+    def __init__(self, interval: float = 0.005, idle_timeout: float = 1.0):
+        if interval <= 0:
+            raise ValueError("Interval must be positive")
+        super().__init__()
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self._thread: Optional[threading.Thread] = None
+        # ID профилируемого потока -> корневой кадр его сессии
+        self._targets: Dict[int, object] = {}
+
+    def _start(self, root_frame) -> None:
+        with self._lock:
+            self._targets[threading.get_ident()] = root_frame
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="sampling-profiler", daemon=True
+                )
+                self._thread.start()
+
+    def _stop(self) -> None:
+        with self._lock:
+            del self._targets[threading.get_ident()]
+
+    def _run(self) -> None:
+        idle_since = time.monotonic()
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                targets = list(self._targets.items())
+                if not targets:
+                    if time.monotonic() - idle_since >= self.idle_timeout:
+                        self._thread = None
+                        return
+                    continue
+            idle_since = time.monotonic()
+
+            # Снимок засчитывается, только если в стеке найден корневой
+            # кадр сессии, так что он сделан внутри профилируемого блока
+            frames = sys._current_frames()
+            stacks = [
+                self._sample(frames.get(thread_id), root_frame)
+                for thread_id, root_frame in targets
+            ]
+            with self._lock:
+                for stack in stacks:
+                    if stack is not None:
+                        self._stacks[stack] += 1
+
+    @staticmethod
+    def _sample(frame, root_frame) -> Optional[str]:
+        names = []
+        while frame is not None and frame is not root_frame:
+            if frame.f_globals is not _MODULE_GLOBALS:
+                names.append(_frame_name(frame))
+            frame = frame.f_back
+        if frame is None:
+            # Поток уже вышел из профилируемого блока
+            return None
+        names.append(_frame_name(root_frame))
+        names.reverse()
+        return ";".join(names)
+
+
+class TracingProfiler(_StackProfiler):
+    """
+    Детерминированный профилировщик на основе sys.setprofile
+
+    Хук профилирования ставится на поток, поэтому у каждого потока своя
+    сессия (_TraceSession). Уже установленный Python-хук (отладчик,
+    другой TracingProfiler) сохраняется, получает все события во время
+    сессии и восстанавливается после нее. Поверх C-профилировщика
+    (cProfile) сессия не запускается.
+    """
+
+    def _start(self, root_frame) -> None:
+        previous = sys.getprofile()
+        if previous is not None and not callable(previous):
+            raise RuntimeError(
+                f"Another profiler is active in this thread: {previous!r}"
+            )
+        session = _TraceSession(root_frame, previous)
+        self._local.session = session
+        sys.setprofile(session.on_event)
+
+    def _stop(self) -> None:
+        session = self._local.session
+        del self._local.session
+        sys.setprofile(session.previous)
+        stacks = session.collapse()
+        with self._lock:
+            self._stacks.update(stacks)
+
+
+class _TraceSession:
+    """
+    Дерево вызовов одного потока для TracingProfiler
+
+    Стек хранится как путь из идентификаторов узлов дерева вызовов,
+    поэтому событие стоит поиска в словаре и сложения, а строки стеков
+    собираются один раз при завершении сессии.
+    """
+
+    def __init__(self, root_frame, previous):
+        self.previous = previous
+        # Узел дерева: (родитель, имя кадра); вес копится по индексу узла
+        self._nodes: List[Tuple[int, str]] = []
+        self._weights: List[int] = []
+        self._children: Dict[tuple, int] = {}
+        self._path: List[int] = []
+        self._child(None, _frame_name(root_frame))
+        self._last = _perf_counter_ns()
+
+    def _child(self, key, name: str) -> None:
+        """Перейти в дочерний узел текущего (создать при первом вызове)"""
+        parent = self._path[-1] if self._path else -1
+        node = self._children.get((parent, key))
+        if node is None:
+            node = len(self._nodes)
+            self._nodes.append((parent, name))
+            self._weights.append(0)
+            self._children[(parent, key)] = node
+        self._path.append(node)
+
+    def collapse(self) -> Counter:
+        """Свернутые стеки: "a;b;c" -> собственное время"""
+        stacks: Counter = Counter()
+        names: List[str] = []
+        for node, (parent, name) in enumerate(self._nodes):
+            # Родитель всегда создается раньше потомка
+            names.append(name if parent < 0 else f"{names[parent]};{name}")
+            if self._weights[node]:
+                stacks[names[node]] += self._weights[node]
+        return stacks
+
+    def on_event(self, frame, event: str, arg) -> None:
+        if self.previous is not None:
+            self.previous(frame, event, arg)
+
+        now = _perf_counter_ns()
+        if frame.f_globals is _MODULE_GLOBALS:
+            # Время внутри __enter__/__exit__ самого профилировщика
+            self._last = now
+            return
+
+        path = self._path
+        current = path[-1]
+        self._weights[current] += now - self._last
+
+        if event == "call":
+            node = self._children.get((current, frame.f_code))
+            if node is None:
+                self._child(frame.f_code, _frame_name(frame))
+            else:
+                path.append(node)
+        elif event == "c_call":
+            key = (
+                getattr(arg, "__module__", None),
+                getattr(arg, "__qualname__", None) or type(arg).__qualname__
+            )
+            node = self._children.get((current, key))
+            if node is None:
+                self._child(key, f"{key[0] or 'builtins'}:{key[1]}")
+            else:
+                path.append(node)
+        elif len(path) > 1:
+            # return / c_return / c_exception; корневой кадр не снимаем
+            path.pop()
+
+        self._last = _perf_counter_ns()
+
+
+_MODULE_GLOBALS = globals()
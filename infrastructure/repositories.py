@@ -2,26 +2,304 @@
 Инфраструктурные реализации репозиториев
 """
 
-from typing import Dict
-from domain.entities import Order
+import math
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional
+from domain.entities import Order, OrderLine, OrderStatus
+from domain.value_objects import Money
 from application.use_cases import OrderRepository
 
 
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Политика хранения: когда оплаченные заказы уходят в архив"""
+    max_age: timedelta
+    check_every: int = 1000
+    
+    def __post_init__(self):
+        if self.max_age < timedelta(0):
+            raise ValueError("Max age cannot be negative")
+        if self.check_every < 1:
+            raise ValueError("Check interval must be positive")
+
+
+def _to_columns(value: datetime):
+    """Момент времени и UTC-смещение в секундах (NaN для naive datetime)"""
+    offset = value.utcoffset()
+    if offset is None:
+        return value.timestamp(), math.nan
+    return value.timestamp(), offset.total_seconds()
+
+
+def _from_columns(timestamp: float, offset: float) -> datetime:
+    """Обратное преобразование к _to_columns"""
+    if math.isnan(offset):
+        return datetime.fromtimestamp(timestamp)
+    return datetime.fromtimestamp(
+        timestamp, timezone(timedelta(seconds=offset))
+    )
+
+
+class ColumnarOrderArchive:
+    """
+    Колоночный in-memory архив оплаченных заказов
+    
+    Вместо объектов Order хранит плоские массивы по полям, строки заказов
+    всех заказов лежат подряд. Строки (ID клиентов, товары, валюты)
+    интернируются. Заказ восстанавливается в Order при каждом чтении,
+    поэтому чтение медленнее, чем из живого хранилища. Удаленные строки
+    помечаются и вычищаются уплотнением, когда их становится больше,
+    чем живых.
+    
+    Для timezone-aware дат хранится UTC-смещение: восстановленная дата
+    равна исходной, но ее tzinfo становится фиксированным смещением.
+    """
+    
+    # Меньше стольких удаленных строк уплотнение не запускается
+    COMPACT_MIN_DEAD = 64
+    
+    def __init__(self):
+        self._rows: Dict[str, int] = {}
+        self._strings: Dict[str, str] = {}
+        self._order_ids: List[str] = []
+        self._customer_ids: List[str] = []
+        self._created_at = array("d")
+        self._created_offset = array("d")
+        self._paid_at = array("d")
+        self._paid_offset = array("d")
+        # Строки заказа i: индексы _line_start[i] .. _line_start[i + 1]
+        self._line_start = array("q", [0])
+        self._products: List[str] = []
+        self._quantities = array("q")
+        self._unit_amounts = array("d")
+        self._currencies: List[str] = []
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def __contains__(self, order_id: str) -> bool:
+        return order_id in self._rows
+    
+    @property
+    def stored_rows(self) -> int:
+        """Количество строк в колонках, включая удаленные"""
+        return len(self._order_ids)
+    
+    def _intern(self, value: str) -> str:
+        return self._strings.setdefault(value, value)
+    
+    def append(self, order: Order) -> None:
+        """
+        Добавить оплаченный заказ в архив (заменяет прежнюю копию)
+    
+        Все колонки сначала проверяются и конвертируются, поэтому при
+        ошибке архив не меняется.
+    
+        Raises:
+            ValueError: заказ не оплачен
+            TypeError, OverflowError: поле не помещается в колонку
+        """
+        if not order.is_paid:
+            raise ValueError(f"Only paid orders can be archived: {order.order_id}")
+    
+        created_at, created_offset = _to_columns(order.created_at)
+        paid_at, paid_offset = _to_columns(order.paid_at)
+        lines = order.lines
+        quantities = array("q", [line.quantity for line in lines])
+        unit_amounts = array("d", [line.unit_price.amount for line in lines])
+        strings = [order.order_id, order.customer_id]
+        for line in lines:
+            strings.append(line.product_name)
+            strings.append(line.unit_price.currency)
+        if not all(isinstance(value, str) for value in strings):
+            raise TypeError(f"Order {order.order_id} has non-string fields")
+    
+        self.discard(order.order_id)
+        self._rows[order.order_id] = len(self._order_ids)
+        self._order_ids.append(order.order_id)
+        self._customer_ids.append(self._intern(order.customer_id))
+        self._created_at.append(created_at)
+        self._created_offset.append(created_offset)
+        self._paid_at.append(paid_at)
+        self._paid_offset.append(paid_offset)
+        self._products.extend(self._intern(line.product_name) for line in lines)
+        self._quantities.extend(quantities)
+        self._unit_amounts.extend(unit_amounts)
+        self._currencies.extend(
+            self._intern(line.unit_price.currency) for line in lines
+        )
+        self._line_start.append(len(self._products))
+    
+    def get(self, order_id: str) -> Optional[Order]:
+        """Восстановить заказ из архива"""
+        row = self._rows.get(order_id)
+        if row is None:
+            return None
+    
+        lines = [
+            OrderLine(
+                product_name=self._products[i],
+                quantity=self._quantities[i],
+                unit_price=Money(self._unit_amounts[i], self._currencies[i])
+            )
+            for i in range(self._line_start[row], self._line_start[row + 1])
+        ]
+        order = Order(order_id, self._customer_ids[row], lines)
+        order.status = OrderStatus.PAID
+        order.created_at = _from_columns(
+            self._created_at[row], self._created_offset[row]
+        )
+        order.paid_at = _from_columns(self._paid_at[row], self._paid_offset[row])
+        return order
+    
+    def discard(self, order_id: str) -> None:
+        """Удалить заказ из архива"""
+        if self._rows.pop(order_id, None) is None:
+            return
+        dead = len(self._order_ids) - len(self._rows)
+        if dead >= self.COMPACT_MIN_DEAD and dead > len(self._rows):
+            self._compact()
+    
+    def _compact(self) -> None:
+        """Переписать колонки, оставив только живые строки"""
+        live_rows = sorted(self._rows.values())
+        order_ids = self._order_ids
+        customer_ids = self._customer_ids
+        created_at = self._created_at
+        created_offset = self._created_offset
+        paid_at = self._paid_at
+        paid_offset = self._paid_offset
+        line_start = self._line_start
+        products = self._products
+        quantities = self._quantities
+        unit_amounts = self._unit_amounts
+        currencies = self._currencies
+    
+        self._order_ids = [order_ids[row] for row in live_rows]
+        self._customer_ids = [customer_ids[row] for row in live_rows]
+        self._created_at = array("d", (created_at[row] for row in live_rows))
+        self._created_offset = array(
+            "d", (created_offset[row] for row in live_rows)
+        )
+        self._paid_at = array("d", (paid_at[row] for row in live_rows))
+        self._paid_offset = array("d", (paid_offset[row] for row in live_rows))
+        self._line_start = array("q", [0])
+        self._products = []
+        self._quantities = array("q")
+        self._unit_amounts = array("d")
+        self._currencies = []
+        for row in live_rows:
+            start, end = line_start[row], line_start[row + 1]
+            self._products.extend(products[start:end])
+            self._quantities.extend(quantities[start:end])
+            self._unit_amounts.extend(unit_amounts[start:end])
+            self._currencies.extend(currencies[start:end])
+            self._line_start.append(len(self._products))
+        self._rows = {
+            order_id: row for row, order_id in enumerate(self._order_ids)
+        }
+        # Строки удаленных заказов не должны держаться таблицей интернирования
+        self._strings = {}
+        for value in self._customer_ids + self._products + self._currencies:
+            self._strings.setdefault(value, value)
+    
+    def clear(self) -> None:
+        """Очистить архив"""
+        self._rows.clear()
+        self._strings.clear()
+        self._order_ids.clear()
+        self._customer_ids.clear()
+        del self._created_at[:]
+        del self._created_offset[:]
+        del self._paid_at[:]
+        del self._paid_offset[:]
+        del self._line_start[1:]
+        self._products.clear()
+        del self._quantities[:]
+        del self._unit_amounts[:]
+        self._currencies.clear()
+
+
 class InMemoryOrderRepository(OrderRepository):
     """In-memory реализация репозитория заказов"""
     
-    def __init__(self):
+    def __init__(self, retention: Optional[RetentionPolicy] = None,
+                 clock: Callable[[], datetime] = datetime.now):
         self._storage: Dict[str, Order] = {}
+        self._archive = ColumnarOrderArchive()
+        self.retention = retention
+        self._clock = clock
+        self._saves_since_check = 0
     
     def get_by_id(self, order_id: str) -> Order:
         order = self._storage.get(order_id)
+        if order is None:
+            order = self._archive.get(order_id)
         if order is None:
             raise ValueError(f"Order with id {order_id} not found")
         return order
     
     def save(self, order: Order) -> None:
         self._storage[order.order_id] = order
+        self._archive.discard(order.order_id)
+    
+        if self.retention is not None:
+            self._saves_since_check += 1
+            if self._saves_since_check >= self.retention.check_every:
+                self.archive_expired()
+    
+    def archive_expired(self) -> int:
+        """
+        Перенести в архив оплаченные заказы старше порога политики
+    
+        Заказы, которые не помещаются в колонки архива (например, дробное
+        количество в строке) или чью дату оплаты нельзя сравнить с часами
+        репозитория (naive против timezone-aware), остаются в живом
+        хранилище.
+    
+        Returns:
+            int: количество перенесенных заказов
+        """
+        self._saves_since_check = 0
+        if self.retention is None:
+            return 0
+    
+        threshold = self._clock() - self.retention.max_age
+        expired = [
+            order for order in self._storage.values()
+            if order.is_paid and self._is_older(order.paid_at, threshold)
+        ]
+        archived = 0
+        for order in expired:
+            try:
+                self._archive.append(order)
+            except (TypeError, ValueError, OverflowError):
+                continue
+            del self._storage[order.order_id]
+            archived += 1
+        return archived
+    
+    @staticmethod
+    def _is_older(moment: datetime, threshold: datetime) -> bool:
+        """Сравнение, не падающее на смеси naive и aware дат"""
+        try:
+            return moment <= threshold
+        except TypeError:
+            return False
+    
+    @property
+    def live_count(self) -> int:
+        """Количество заказов в живом хранилище"""
+        return len(self._storage)
+    
+    @property
+    def archived_count(self) -> int:
+        """Количество заказов в архиве"""
+        return len(self._archive)
     
     def clear(self) -> None:
         """Очистить хранилище (для тестов)"""
-        self._storage.clear()
\ No newline at end of file
+        self._storage.clear()
+        self._archive.clear()
\ No newline at end of file
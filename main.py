@@ -6,6 +6,7 @@
 
 import sys
 import os
+import argparse
 
 # Добавляем текущую папку в путь Python для корректных импортов
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -22,6 +23,7 @@ try:
     from application.use_cases import PayOrderUseCase, PayOrderResult
     from infrastructure.repositories import InMemoryOrderRepository
     from infrastructure.gateways import FakePaymentGateway
+    from infrastructure.profiling import TracingProfiler
     
     print("✅ Все модули успешно импортированы!")
     
@@ -180,14 +182,56 @@ def run_tests():
     return result.returncode == 0
 
 
-def main():
-    """Главная функция"""
+def parse_args(argv=None):
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(description="Лабораторная работа 7")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="профилировать демонстрационные сценарии (TracingProfiler)"
+    )
+    parser.add_argument(
+        "--profile-output", default="profile.folded",
+        help="файл для свернутых стеков (flame graph)"
+    )
+    parser.add_argument(
+        "--profile-top", type=int, default=10,
+        help="число горячих точек в сводке"
+    )
+    return parser.parse_args(argv)
+
+
+def run_demonstrations(args):
+    """Запуск демонстрационных сценариев (опционально под профилировщиком)"""
+    if not args.profile:
+        demonstrate_successful_payment()
+        demonstrate_error_cases()
+        demonstrate_domain_invariants()
+        return
     
-    try:
-        # Демонстрационные сценарии
+    # Демонстрация длится доли миллисекунды, семплирующий профилировщик
+    # не успел бы снять ни одного стека
+    profiler = TracingProfiler()
+    
+    with profiler:
         demonstrate_successful_payment()
         demonstrate_error_cases()
         demonstrate_domain_invariants()
+    
+    profiler.write_collapsed(args.profile_output)
+    print("\n" + "="*60)
+    print("ПРОФИЛЬ")
+    print("="*60)
+    print(profiler.format_top(args.profile_top))
+    print(f"\n🔥 Свернутые стеки сохранены в {args.profile_output}")
+
+
+def main(argv=None):
+    """Главная функция"""
+    args = parse_args(argv)
+    
+    try:
+        # Демонстрационные сценарии
+        run_demonstrations(args)
         
         # Запуск тестов
         print("\n" + "="*60)
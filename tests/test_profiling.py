@@ -0,0 +1,263 @@
+"""
+Модульные тесты для профилировщиков
+"""
+
+import cProfile
+import os
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from domain.entities import Order
+from domain.value_objects import Money
+from application.use_cases import PayOrderUseCase
+from infrastructure.repositories import InMemoryOrderRepository
+from infrastructure.gateways import FakePaymentGateway
+from infrastructure.profiling import SamplingProfiler, TracingProfiler
+
+
+class SlowPaymentGateway(FakePaymentGateway):
+    """Платежный шлюз с задержкой, чтобы попасть в снимки профилировщика"""
+
+    def charge(self, order_id, amount):
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+        return super().charge(order_id, amount)
+
+
+class BlockingPaymentGateway(FakePaymentGateway):
+    """Шлюз, задерживающий оплату каждого заказа до сигнала из теста"""
+
+    def __init__(self, order_ids):
+        super().__init__()
+        self.started = {order_id: threading.Event() for order_id in order_ids}
+        self.release = {order_id: threading.Event() for order_id in order_ids}
+
+    def charge(self, order_id, amount):
+        if order_id in self.started:
+            self.started[order_id].set()
+            self.release[order_id].wait(timeout=5)
+        return super().charge(order_id, amount)
+
+
+class TestProfiling(unittest.TestCase):
+    """Тесты профилирования сценария оплаты"""
+
+    def setUp(self):
+        self.repository = InMemoryOrderRepository()
+        order = Order(order_id="order_1", customer_id="customer_1")
+        order.add_line("Product A", 2, Money(10.0))
+        self.repository.save(order)
+
+    def test_sampling_profiler_finds_slow_gateway(self):
+        """Семплирующий профилировщик видит медленный шлюз"""
+        profiler = SamplingProfiler(interval=0.001)
+        use_case = PayOrderUseCase(
+            self.repository, SlowPaymentGateway(), profiler=profiler
+        )
+
+        result = use_case.execute("order_1")
+
+        self.assertTrue(result.success)
+        hotspots = profiler.top(3)
+        self.assertTrue(hotspots)
+        self.assertIn("SlowPaymentGateway.charge", hotspots[0].frame)
+        for stack in profiler.stacks:
+            self.assertIn("PayOrderUseCase.execute", stack.split(";")[0])
+
+    def test_sampling_profiler_many_fast_executes(self):
+        """Много коротких execute подряд используют один поток-семплер"""
+        profiler = SamplingProfiler(interval=0.001)
+        use_case = PayOrderUseCase(
+            self.repository, FakePaymentGateway(), profiler=profiler
+        )
+        for i in range(5000):
+            order = Order(order_id=f"batch_{i}", customer_id="customer_1")
+            order.add_line("Product A", 2, Money(10.0))
+            order.add_line("Product B", 1, Money(15.5))
+            self.repository.save(order)
+
+        threads_before = threading.active_count()
+        for i in range(5000):
+            use_case.execute(f"batch_{i}")
+            self.assertLessEqual(threading.active_count(), threads_before + 1)
+
+        self.assertGreater(sum(profiler.stacks.values()), 0)
+
+    def test_tracing_profiler_collapsed_output(self):
+        """Детерминированный профилировщик пишет свернутые стеки"""
+        profiler = TracingProfiler()
+        use_case = PayOrderUseCase(
+            self.repository, FakePaymentGateway(), profiler=profiler
+        )
+
+        use_case.execute("order_1")
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.folded")
+            profiler.write_collapsed(path)
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+
+        self.assertTrue(lines)
+        for line in lines:
+            stack, weight = line.rsplit(" ", 1)
+            self.assertGreater(int(weight), 0)
+        self.assertTrue(any("Order.pay" in line for line in lines))
+
+    def test_profiler_frames_are_excluded(self):
+        """Кадры самого профилировщика не попадают в стеки"""
+        profiler = TracingProfiler()
+        use_case = PayOrderUseCase(
+            self.repository, FakePaymentGateway(), profiler=profiler
+        )
+
+        with profiler:
+            use_case.execute("order_1")
+
+        self.assertTrue(profiler.stacks)
+        for stack in profiler.stacks:
+            self.assertNotIn("infrastructure.profiling", stack)
+
+    def run_interleaved_threads(self, profiler, only_second_active=None):
+        """
+        Поток A входит в профилировщик первым и выходит первым, поток B
+        выходит последним, после чего A снова вызывает execute
+        """
+        for order_id in ("order_2", "order_3"):
+            order = Order(order_id=order_id, customer_id="customer_2")
+            order.add_line("Product B", 1, Money(15.5))
+            self.repository.save(order)
+        gateway = BlockingPaymentGateway(["order_1", "order_2"])
+        use_case = PayOrderUseCase(self.repository, gateway, profiler=profiler)
+        results = {}
+        first_done = threading.Event()
+        second_done = threading.Event()
+
+        def pay_first():
+            results["order_1"] = use_case.execute("order_1")
+            first_done.set()
+            second_done.wait(timeout=5)
+            results["order_3"] = use_case.execute("order_3")
+
+        def pay_second():
+            results["order_2"] = use_case.execute("order_2")
+
+        first = threading.Thread(target=pay_first)
+        second = threading.Thread(target=pay_second)
+        first.start()
+        self.assertTrue(gateway.started["order_1"].wait(timeout=5))
+        second.start()
+        self.assertTrue(gateway.started["order_2"].wait(timeout=5))
+        gateway.release["order_1"].set()
+        self.assertTrue(first_done.wait(timeout=5))
+        if only_second_active is not None:
+            only_second_active()
+        gateway.release["order_2"].set()
+        second.join()
+        second_done.set()
+        first.join()
+
+        for order_id in ("order_1", "order_2", "order_3"):
+            self.assertTrue(
+                results[order_id].success, results[order_id].error_message
+            )
+
+    def test_tracing_profiler_threads_have_separate_sessions(self):
+        """Сессии разных потоков на общем TracingProfiler не мешают друг другу"""
+        profiler = TracingProfiler()
+
+        self.run_interleaved_threads(profiler)
+
+        charge_weight = sum(
+            weight for stack, weight in profiler.stacks.items()
+            if "BlockingPaymentGateway.charge" in stack
+        )
+        self.assertGreater(charge_weight, 0)
+        self.assertIsNone(sys.getprofile())
+
+    def test_sampling_profiler_threads_have_separate_sessions(self):
+        """Поток, вошедший вторым, семплируется после выхода первого"""
+        profiler = SamplingProfiler(interval=0.001)
+
+        def sample_second_only():
+            profiler.reset()
+            time.sleep(0.05)
+
+        self.run_interleaved_threads(profiler, sample_second_only)
+
+        self.assertTrue(any(
+            "BlockingPaymentGateway.charge" in stack
+            for stack in profiler.stacks
+        ))
+
+    def test_nested_distinct_tracing_profilers(self):
+        """Внутренний профилировщик не отнимает события у внешнего"""
+        outer = TracingProfiler()
+        inner = TracingProfiler()
+        use_case = PayOrderUseCase(
+            self.repository, FakePaymentGateway(), profiler=inner
+        )
+
+        with outer:
+            use_case.execute("order_1")
+
+        for profiler in (outer, inner):
+            self.assertTrue(any(
+                stack.endswith("Order.pay") for stack in profiler.stacks
+            ))
+        self.assertIsNone(sys.getprofile())
+
+    def test_existing_profile_hook_is_restored(self):
+        """Ранее установленный хук получает события и восстанавливается"""
+        events = []
+
+        def hook(frame, event, arg):
+            events.append(event)
+
+        sys.setprofile(hook)
+        try:
+            with TracingProfiler():
+                Order("order_x", "customer_1").is_empty
+            restored = sys.getprofile()
+        finally:
+            sys.setprofile(None)
+
+        self.assertIs(restored, hook)
+        self.assertIn("call", events)
+
+    def test_tracing_profiler_refuses_c_profiler(self):
+        """Поверх cProfile сессия не запускается"""
+        c_profiler = cProfile.Profile()
+        profiler = TracingProfiler()
+        c_profiler.enable()
+        try:
+            with self.assertRaises(RuntimeError):
+                profiler.__enter__()
+        finally:
+            c_profiler.disable()
+
+        with profiler:
+            pass
+
+    def test_nested_profiling_shares_session(self):
+        """Вложенный вход в профилировщик не перезапускает сбор"""
+        profiler = TracingProfiler()
+        use_case = PayOrderUseCase(
+            self.repository, FakePaymentGateway(), profiler=profiler
+        )
+
+        with profiler:
+            use_case.execute("order_1")
+
+        self.assertTrue(any(
+            "test_nested_profiling_shares_session;" in stack
+            and "PayOrderUseCase.execute" in stack
+            for stack in profiler.stacks
+        ))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,206 @@
+"""
+Модульные тесты для репозитория заказов и архива оплаченных заказов
+"""
+
+import unittest
+from datetime import datetime, timedelta, timezone
+from domain.entities import Order, InvalidOrderOperation
+from domain.value_objects import Money
+from infrastructure.repositories import (
+    InMemoryOrderRepository, RetentionPolicy, ColumnarOrderArchive
+)
+
+
+class FakeClock:
+    """Управляемые часы для тестов"""
+
+    def __init__(self, now: datetime):
+        self.now = now
+
+    def __call__(self) -> datetime:
+        return self.now
+
+
+class TestOrderRetention(unittest.TestCase):
+    """Тесты переноса оплаченных заказов в архив"""
+
+    def setUp(self):
+        self.clock = FakeClock(datetime(2024, 1, 1, 12, 0))
+        self.repository = InMemoryOrderRepository(
+            retention=RetentionPolicy(max_age=timedelta(hours=1)),
+            clock=self.clock
+        )
+
+    def create_paid_order(self, order_id: str) -> Order:
+        """Создать оплаченный заказ"""
+        order = Order(order_id=order_id, customer_id="customer_1")
+        order.add_line("Product A", 2, Money(10.0))
+        order.add_line("Product B", 1, Money(15.5, "EUR"))
+        order.pay()
+        order.paid_at = self.clock.now
+        self.repository.save(order)
+        return order
+
+    def test_expired_paid_order_is_archived_and_resolved(self):
+        """Старый оплаченный заказ уходит в архив и читается прозрачно"""
+        original = self.create_paid_order("order_1")
+
+        self.clock.now += timedelta(hours=2)
+        archived = self.repository.archive_expired()
+
+        self.assertEqual(archived, 1)
+        self.assertEqual(self.repository.live_count, 0)
+        self.assertEqual(self.repository.archived_count, 1)
+
+        restored = self.repository.get_by_id("order_1")
+        self.assertTrue(restored.is_paid)
+        self.assertEqual(restored.customer_id, original.customer_id)
+        self.assertEqual(restored.lines, original.lines)
+        self.assertEqual(restored.paid_at, original.paid_at)
+        self.assertEqual(restored.created_at, original.created_at)
+
+        with self.assertRaises(InvalidOrderOperation):
+            restored.add_line("Product C", 1, Money(5.0))
+
+    def test_fresh_and_unpaid_orders_stay_live(self):
+        """Свежие и неоплаченные заказы остаются в живом хранилище"""
+        self.create_paid_order("paid_old")
+        unpaid = Order(order_id="unpaid", customer_id="customer_2")
+        unpaid.add_line("Product A", 1, Money(1.0))
+        self.repository.save(unpaid)
+
+        self.clock.now += timedelta(hours=2)
+        self.create_paid_order("paid_fresh")
+        self.repository.archive_expired()
+
+        self.assertEqual(self.repository.archived_count, 1)
+        self.assertEqual(self.repository.live_count, 2)
+        self.assertIs(self.repository.get_by_id("unpaid"), unpaid)
+
+    def test_save_triggers_archiving_by_policy(self):
+        """Перенос в архив запускается автоматически каждые N сохранений"""
+        repository = InMemoryOrderRepository(
+            retention=RetentionPolicy(max_age=timedelta(0), check_every=3),
+            clock=self.clock
+        )
+        for i in range(3):
+            order = Order(order_id=f"order_{i}", customer_id="customer_1")
+            order.add_line("Product", 1, Money(1.0))
+            order.pay()
+            order.paid_at = self.clock.now
+            repository.save(order)
+
+        self.assertEqual(repository.live_count, 0)
+        self.assertEqual(repository.archived_count, 3)
+
+    def test_resave_round_trips_do_not_grow_archive(self):
+        """Повторное сохранение и архивация заказа не копят данные"""
+        self.create_paid_order("order_1")
+        for _ in range(1000):
+            self.clock.now += timedelta(hours=2)
+            self.repository.archive_expired()
+            order = self.repository.get_by_id("order_1")
+            order.paid_at = self.clock.now
+            self.repository.save(order)
+
+        self.clock.now += timedelta(hours=2)
+        self.repository.archive_expired()
+
+        archive = self.repository._archive
+        self.assertEqual(len(archive), 1)
+        self.assertLessEqual(
+            archive.stored_rows, ColumnarOrderArchive.COMPACT_MIN_DEAD + 1
+        )
+        self.assertEqual(len(self.repository.get_by_id("order_1").lines), 2)
+
+    def test_unarchivable_order_stays_live(self):
+        """Заказ, не помещающийся в колонки, остается живым и не ломает архив"""
+        bad = Order(order_id="bad", customer_id="customer_1")
+        bad.add_line("Product A", 1.5, Money(10.0))
+        bad.pay()
+        bad.paid_at = self.clock.now
+        self.repository.save(bad)
+        self.create_paid_order("good")
+
+        self.clock.now += timedelta(hours=2)
+        archived = self.repository.archive_expired()
+
+        self.assertEqual(archived, 1)
+        self.assertIs(self.repository.get_by_id("bad"), bad)
+        self.assertNotIn("bad", self.repository._archive)
+        good = self.repository.get_by_id("good")
+        self.assertEqual(
+            [line.product_name for line in good.lines],
+            ["Product A", "Product B"]
+        )
+
+    def test_timezone_aware_dates_round_trip(self):
+        """Aware-даты восстанавливаются из архива с тем же смещением"""
+        moscow = timezone(timedelta(hours=3))
+        clock = FakeClock(datetime(2024, 1, 1, 12, 0, tzinfo=timezone.utc))
+        repository = InMemoryOrderRepository(
+            retention=RetentionPolicy(max_age=timedelta(hours=1)),
+            clock=clock
+        )
+        order = Order(order_id="aware", customer_id="customer_1")
+        order.add_line("Product A", 1, Money(10.0))
+        order.pay()
+        order.created_at = datetime(2024, 1, 1, 13, 0, tzinfo=moscow)
+        order.paid_at = clock.now
+        repository.save(order)
+
+        clock.now += timedelta(hours=2)
+        self.assertEqual(repository.archive_expired(), 1)
+
+        restored = repository.get_by_id("aware")
+        self.assertEqual(restored.paid_at, order.paid_at)
+        self.assertEqual(restored.paid_at.utcoffset(), timedelta(0))
+        self.assertEqual(restored.created_at, order.created_at)
+        self.assertEqual(restored.created_at.utcoffset(), timedelta(hours=3))
+
+    def test_aware_clock_with_naive_orders_does_not_break_save(self):
+        """Несравнимые даты оставляют заказ живым, save не падает"""
+        repository = InMemoryOrderRepository(
+            retention=RetentionPolicy(max_age=timedelta(0), check_every=1),
+            clock=lambda: datetime.now(timezone.utc)
+        )
+        order = Order(order_id="naive", customer_id="customer_1")
+        order.add_line("Product A", 1, Money(10.0))
+        order.pay()
+
+        repository.save(order)
+
+        self.assertEqual(repository.live_count, 1)
+        self.assertIs(repository.get_by_id("naive"), order)
+
+    def test_compaction_drops_strings_of_removed_orders(self):
+        """Уплотнение очищает таблицу интернирования от удаленных строк"""
+        archive = ColumnarOrderArchive()
+        for i in range(ColumnarOrderArchive.COMPACT_MIN_DEAD + 1):
+            order = Order(order_id=f"order_{i}", customer_id=f"customer_{i}")
+            order.add_line(f"Product {i}", 1, Money(1.0))
+            order.pay()
+            archive.append(order)
+        for i in range(1, ColumnarOrderArchive.COMPACT_MIN_DEAD + 1):
+            archive.discard(f"order_{i}")
+
+        self.assertEqual(archive.stored_rows, 1)
+        self.assertEqual(
+            set(archive._strings), {"customer_0", "Product 0", "USD"}
+        )
+        self.assertEqual(archive.get("order_0").lines[0].product_name, "Product 0")
+
+    def test_archive_rejects_unpaid_order(self):
+        """В архив нельзя положить неоплаченный заказ"""
+        order = Order(order_id="order_1", customer_id="customer_1")
+        with self.assertRaises(ValueError):
+            ColumnarOrderArchive().append(order)
+
+    def test_missing_order_not_found(self):
+        """Отсутствующий заказ не находится ни в одном хранилище"""
+        with self.assertRaises(ValueError):
+            self.repository.get_by_id("missing")
+
+
+if __name__ == "__main__":
+    unittest.main()